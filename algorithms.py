@@ -1,60 +1,71 @@
-import random
+import os
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-from topology import get_k_shortest_paths, get_path_distance, get_node_names
-from core import calculate_slots, Network
+from topology import get_k_shortest_paths_with_dist, get_node_names
+from core import calculate_slots, slots_for, build_edge_index, find_free_run, Network
+
+NODE_NAMES = get_node_names()
 
 
 # --- BASELINE: SP-FF ---
-def run_sp_ff(topology, demands, k=3, num_slots=640, export_file=None):
+def run_sp_ff(topology, demands, k=3, num_slots=640, export_file=None, order=None):
     """
     Ejecuta SP-FF secuencialmente.
+    `demands` es un `Demands` (SoA); `order` es el orden de procesamiento
+    (índices), por defecto el orden original.
     """
     net = Network(topology, num_slots)
-    node_names = get_node_names()
     assigned_count = 0
+    rows = []
 
     if export_file:
-        export_file.write(
+        rows.append(
             f"{'ID':<5} {'Source':<15} {'Dest':<15} {'GBPS':<6} {'Status':<10} {'Slots':<10} {'Modulation':<10} {'Path'}\n"
         )
-        export_file.write("-" * 100 + "\n")
+        rows.append("-" * 100 + "\n")
+
+    if order is None:
+        order = range(len(demands))
 
-    for demand in demands:
-        src_id, dst_id = demand["source"], demand["destination"]
-        bw = demand["bandwidth"]
-        paths = get_k_shortest_paths(topology, src_id, dst_id, k)
-        allocated = False
-        row_str = ""
+    for i in order:
+        src_id, dst_id = int(demands.src[i]), int(demands.dst[i])
+        bw = int(demands.bw[i])
+        paths = get_k_shortest_paths_with_dist(topology, src_id, dst_id, k)
+        allocation = None
 
-        for path in paths:
-            dist = get_path_distance(topology, path)
+        for path, dist in paths:
             slots_needed, mod_name = calculate_slots(bw, dist)
 
             if not slots_needed:
                 continue
 
-            start_slot = net.find_first_fit(path, slots_needed)
+            start_slot = net.find_and_allocate(path, slots_needed)
 
             if start_slot is not None:
-                net.allocate(path, start_slot, slots_needed)
                 assigned_count += 1
-                allocated = True
+                allocation = (path, start_slot, slots_needed, mod_name)
+                break
+
+        # El formateo del reporte solo se hace si se exporta
+        if export_file:
+            demand_id = int(demands.id[i])
+            s_name = NODE_NAMES.get(src_id, str(src_id))
+            d_name = NODE_NAMES.get(dst_id, str(dst_id))
 
-                s_name = node_names.get(src_id, str(src_id))
-                d_name = node_names.get(dst_id, str(dst_id))
+            if allocation:
+                path, start_slot, slots_needed, mod_name = allocation
                 slot_range = f"{start_slot}-{start_slot + slots_needed - 1}"
                 path_str = "->".join(map(str, path))
+                rows.append(
+                    f"{demand_id:<5} {s_name:<15} {d_name:<15} {bw:<6} {'ASSIGNED':<10} {slot_range:<10} {mod_name:<10} {path_str}\n"
+                )
+            else:
+                rows.append(
+                    f"{demand_id:<5} {s_name:<15} {d_name:<15} {bw:<6} {'BLOCKED':<10} {'-':<10} {'-':<10} {'-'}\n"
+                )
 
-                row_str = f"{demand['id']:<5} {s_name:<15} {d_name:<15} {bw:<6} {'ASSIGNED':<10} {slot_range:<10} {mod_name:<10} {path_str}\n"
-                break
-
-        if not allocated:
-            s_name = node_names.get(src_id, str(src_id))
-            d_name = node_names.get(dst_id, str(dst_id))
-            row_str = f"{demand['id']:<5} {s_name:<15} {d_name:<15} {bw:<6} {'BLOCKED':<10} {'-':<10} {'-':<10} {'-'}\n"
-
-        if export_file:
-            export_file.write(row_str)
+    if export_file:
+        export_file.write("".join(rows))
 
     return {
         "assigned": assigned_count,
@@ -64,10 +75,100 @@ def run_sp_ff(topology, demands, k=3, num_slots=640, export_file=None):
     }
 
 
+def _silent(*args, **kwargs):
+    """Sustituto de print cuando el GA corre sin salida de progreso."""
+
+
+# --- EVALUACIÓN VECTORIZADA (GA) ---
+def evaluate_chromosome(order, path_edges, slots_table, num_edges, num_slots):
+    """
+    Asigna las demandas en el orden dado (First Fit) sobre bitsets de espectro
+    por enlace. Retorna (max_slot, asignadas, suma_indices_inicio).
+    """
+    occ = [0] * num_edges
+    full_mask = (1 << num_slots) - 1
+    assigned = 0
+    sum_start_indices = 0
+    max_slot = -1
+
+    for d in order:
+        slots_row = slots_table[d]
+        for rank, edges in enumerate(path_edges[d]):
+            slots = int(slots_row[rank])
+            if slots == 0:
+                continue
+
+            # Ocupación combinada del camino (OR de bitsets)
+            merged = 0
+            for e in edges:
+                merged |= occ[e]
+            start = find_free_run(~merged & full_mask, slots)
+            if start is None:
+                continue
+
+            window = ((1 << slots) - 1) << start
+            for e in edges:
+                occ[e] |= window
+            assigned += 1
+            sum_start_indices += start
+            if start + slots - 1 > max_slot:
+                max_slot = start + slots - 1
+            break
+
+    return max_slot, assigned, sum_start_indices
+
+
+# Tablas de solo lectura de cada proceso worker (se envían una vez al iniciar)
+_worker_tables = None
+
+
+def _init_worker(path_edges, slots_table, num_edges, num_slots):
+    global _worker_tables
+    _worker_tables = (path_edges, slots_table, num_edges, num_slots)
+
+
+def _evaluate_chunk(chromosomes):
+    return [evaluate_chromosome(c, *_worker_tables) for c in chromosomes]
+
+
+def evaluate_population(
+    chromosomes, path_edges, slots_table, num_edges, num_slots, executor=None, n_jobs=1
+):
+    """
+    Evalúa un lote de cromosomas (filas de un array 2D).
+    Con `executor` (pool inicializado con _init_worker) reparte el lote en
+    `n_jobs` bloques evaluados en paralelo.
+    Retorna arrays (fitness, max_slot, asignadas, compactación).
+    """
+    if executor is not None and n_jobs > 1:
+        chunks = np.array_split(chromosomes, n_jobs)
+        results = [r for part in executor.map(_evaluate_chunk, chunks) for r in part]
+    else:
+        results = [
+            evaluate_chromosome(c, path_edges, slots_table, num_edges, num_slots)
+            for c in chromosomes
+        ]
+
+    msi, assigned, compactness = np.array(results, dtype=np.int64).reshape(-1, 3).T
+
+    fitness = (assigned * 1_000_000_000) + ((num_slots - msi) * 1_000_000) - compactness
+    return fitness, msi, assigned, compactness
+
+
 # --- GENETIC ALGORITHM OPTIMIZADO ---
 class GeneticOptimizer:
     def __init__(
-        self, topology, demands, pop_size=100, generations=200, num_slots=320, k_paths=5
+        self,
+        topology,
+        demands,
+        pop_size=100,
+        generations=200,
+        num_slots=320,
+        k_paths=5,
+        n_jobs=1,
+        max_stagnant_cataclysms=3,
+        min_generations=30,
+        verbose=True,
     ):
         self.topology = topology
         self.demands = demands
@@ -75,77 +176,80 @@ class GeneticOptimizer:
         self.generations = generations
         self.num_slots = num_slots
         self.k_paths = k_paths
-        self.rng = random.Random(42)
+        # n_jobs > 1 evalúa la población en procesos; -1 usa todos los núcleos
+        self.n_jobs = (os.cpu_count() or 1) if n_jobs == -1 else n_jobs
+        # Corte anticipado: tras N cataclismos sin mejora (None = desactivado)
+        self.max_stagnant_cataclysms = max_stagnant_cataclysms
+        self.min_generations = min_generations
+        # verbose=False silencia el progreso por generación (corridas en lote)
+        self.verbose = verbose
+        self.rng = np.random.default_rng(42)
         self.path_cache = {}
         self._precompute_paths(k=self.k_paths)
+        self._precompute_tables()
 
     def _precompute_paths(self, k):
-        for d in self.demands:
-            key = (d["source"], d["destination"])
+        for src, dst in zip(self.demands.src, self.demands.dst):
+            key = (int(src), int(dst))
             if key not in self.path_cache:
-                self.path_cache[key] = get_k_shortest_paths(
+                self.path_cache[key] = get_k_shortest_paths_with_dist(
                     self.topology, key[0], key[1], k
                 )
 
-    def _evaluate_fitness(self, chromosome):
-        net = Network(self.topology, self.num_slots)
-        assigned = 0
-        sum_start_indices = 0
-
-        ordered_demands = [self.demands[i] for i in chromosome]
+    def _precompute_tables(self):
+        """
+        Representación plana para el evaluador: ids de enlace, distancia y slots
+        necesarios por (demanda, camino). 0 slots = camino inexistente.
+        """
+        self.edge_index = build_edge_index(self.topology)
+        self.num_edges = len(self.edge_index)
+        self.slots_table = np.zeros((len(self.demands), self.k_paths), dtype=np.int16)
+        self.path_dist_table = np.zeros(
+            (len(self.demands), self.k_paths), dtype=np.int32
+        )
+        has_path = np.zeros((len(self.demands), self.k_paths), dtype=np.bool_)
+        self.path_edges = []
 
-        for demand in ordered_demands:
-            src, dst = demand["source"], demand["destination"]
+        for idx in range(len(self.demands)):
+            src, dst = int(self.demands.src[idx]), int(self.demands.dst[idx])
             paths = self.path_cache.get((src, dst), [])
+            edges_per_path = []
+            for rank, (path, dist) in enumerate(paths):
+                edges_per_path.append(
+                    tuple(
+                        self.edge_index[(path[i], path[i + 1])]
+                        for i in range(len(path) - 1)
+                    )
+                )
+                self.path_dist_table[idx, rank] = dist
+                has_path[idx, rank] = True
+            self.path_edges.append(edges_per_path)
 
-            for path in paths:
-                dist = get_path_distance(self.topology, path)
-                slots, _ = calculate_slots(demand["bandwidth"], dist)
-                if slots:
-                    start = net.find_first_fit(path, slots)
-                    if start is not None:
-                        net.allocate(path, start, slots)
-                        assigned += 1
-                        sum_start_indices += start
-                        break
-
-        max_slot = net.get_max_slot_used()
-
-        score = (
-            (assigned * 1_000_000_000)
-            + ((self.num_slots - max_slot) * 1_000_000)
-            - (sum_start_indices)
-        )
-
-        return score, max_slot, assigned, sum_start_indices
+        # Slots para todas las (demanda, camino) en una sola pasada vectorizada
+        slots = slots_for(self.demands.bw[:, None], self.path_dist_table)
+        self.slots_table[has_path] = slots[has_path]
 
     def optimize(self, export_file_handle=None):
-        indices = list(range(len(self.demands)))
-        population = []
-
-        # 1. Semilla Maestra LPF
-        dists = []
-        for i in indices:
-            d = self.demands[i]
-            paths = self.path_cache.get((d["source"], d["destination"]), [])
-            dist = get_path_distance(self.topology, paths[0]) if paths else 0
-            dists.append(dist)
+        n_demands = len(self.demands)
+        log = print if self.verbose else _silent
+        # Población como matriz contigua int32[pop_size, n_demandas]
+        population = np.empty((self.pop_size, n_demands), dtype=np.int32)
 
-        lpf_chrome = [x for _, x in sorted(zip(dists, indices), reverse=True)]
-        population.append(lpf_chrome[:])
+        # 1. Semilla Maestra LPF: distancia descendente (empates: índice mayor primero)
+        dists = self.path_dist_table[:, 0]
+        lpf_chrome = np.lexsort((np.arange(n_demands), dists))[::-1].astype(np.int32)
+        population[:] = lpf_chrome
 
         # 2. Inicialización por Vecindad
-        print("[GA] Inicializando población con variaciones de LPF...")
-        while len(population) < self.pop_size:
-            clone = lpf_chrome[:]
-            r = self.rng.random()
+        log("[GA] Inicializando población con variaciones de LPF...")
+        init_draws = self.rng.random(self.pop_size - 1)
+        for clone, r in zip(population[1:], init_draws):
             if r < 0.4:
                 self._mutate_swap(clone)
             elif r < 0.7:
                 self._mutate_scramble(clone)
             else:
                 self._mutate_shift_priority(clone)
-            population.append(clone)
 
         best_chrome = None
         best_fitness = -float("inf")
@@ -153,133 +257,203 @@ class GeneticOptimizer:
         global_best_assigned = 0
         global_best_msi = self.num_slots
         stagnation_counter = 0
+        cataclysms_without_improvement = 0
+
+        executor = None
+        if self.n_jobs > 1:
+            executor = ProcessPoolExecutor(
+                max_workers=self.n_jobs,
+                initializer=_init_worker,
+                initargs=(
+                    self.path_edges,
+                    self.slots_table,
+                    self.num_edges,
+                    self.num_slots,
+                ),
+            )
+
+        log(f"{'Gen':<5} | {'MSI':<5} | {'Asignadas':<10} | {'Compactación':<30}")
+        log("-" * 60)
+
+        # Filas de scores: (fitness, msi, asignadas, compactación); dirty = sin evaluar
+        scores = np.zeros((self.pop_size, 4), dtype=np.int64)
+        dirty = np.ones(self.pop_size, dtype=np.bool_)
+
+        # El pool se cierra aunque la evaluación falle (no quedan workers vivos)
+        try:
+            for gen in range(self.generations):
+                # Solo se evalúan los individuos nuevos: la élite conserva su fitness
+                if dirty.any():
+                    scores[dirty] = np.column_stack(
+                        evaluate_population(
+                            population[dirty],
+                            self.path_edges,
+                            self.slots_table,
+                            self.num_edges,
+                            self.num_slots,
+                            executor=executor,
+                            n_jobs=self.n_jobs,
+                        )
+                    )
+                fitness, msi, asg, compactness = scores.T
+
+                top = int(np.argmax(fitness))
+                current_fit = int(fitness[top])
+                current_msi = int(msi[top])
+                current_asg = int(asg[top])
+                current_compact = int(compactness[top])
+
+                real_improvement = False
+                if current_msi < global_best_msi:
+                    global_best_msi = current_msi
+                    real_improvement = True
+
+                if current_asg > global_best_assigned:
+                    global_best_assigned = current_asg
+                    real_improvement = True
+
+                if current_fit > best_fitness:
+                    best_fitness = current_fit
+                    best_chrome = population[top].copy()
+
+                if real_improvement:
+                    stagnation_counter = 0
+                    cataclysms_without_improvement = 0
+                    log(
+                        f"{gen:<5} | {current_msi:<5} | {current_asg:<10} | {current_compact:<30} <--- MEJORA MSI!"
+                    )
+                else:
+                    stagnation_counter += 1
+
+                if gen % 10 == 0 and not real_improvement:
+                    log(
+                        f"{gen:<5} | {global_best_msi:<5} | {global_best_assigned:<10} | {current_compact:<30} (Estancado: {stagnation_counter})"
+                    )
+
+                # --- CATACLISMO RÁPIDO ---
+                if stagnation_counter >= 12:
+                    if (
+                        self.max_stagnant_cataclysms is not None
+                        and cataclysms_without_improvement
+                        >= self.max_stagnant_cataclysms
+                        and gen + 1 >= self.min_generations
+                    ):
+                        log(
+                            f"   >>> FIN ANTICIPADO: {cataclysms_without_improvement} cataclismos sin mejora (gen {gen})"
+                        )
+                        break
 
-        print(f"{'Gen':<5} | {'MSI':<5} | {'Asignadas':<10} | {'Compactación':<30}")
-        print("-" * 60)
-
-        for gen in range(self.generations):
-            fitness_data = []
-
-            for chrom in population:
-                fit_val, msi, asg, compactness = self._evaluate_fitness(chrom)
-                fitness_data.append((chrom, fit_val, msi, asg, compactness))
-
-            fitness_data.sort(key=lambda x: x[1], reverse=True)
-
-            current_top = fitness_data[0]
-            current_fit = current_top[1]
-            current_msi = current_top[2]
-            current_asg = current_top[3]
-            current_compact = current_top[4]
-
-            real_improvement = False
-            if current_msi < global_best_msi:
-                global_best_msi = current_msi
-                real_improvement = True
-
-            if current_asg > global_best_assigned:
-                global_best_assigned = current_asg
-                real_improvement = True
-
-            if current_fit > best_fitness:
-                best_fitness = current_fit
-                best_chrome = current_top[0][:]
-
-            if real_improvement:
-                stagnation_counter = 0
-                print(
-                    f"{gen:<5} | {current_msi:<5} | {current_asg:<10} | {current_compact:<30} <--- MEJORA MSI!"
-                )
-            else:
-                stagnation_counter += 1
-
-            if gen % 10 == 0 and not real_improvement:
-                print(
-                    f"{gen:<5} | {global_best_msi:<5} | {global_best_assigned:<10} | {current_compact:<30} (Estancado: {stagnation_counter})"
-                )
-
-            # --- CATACLISMO RÁPIDO ---
-            if stagnation_counter >= 12:
-                print("   >>> CATACLISMO (Rápido): Reiniciando vecindad...")
-                next_pop = [best_chrome[:]]
-
-                while len(next_pop) < self.pop_size:
-                    c = best_chrome[:]
-                    self._mutate_scramble(c)
-                    self._mutate_shift_priority(c)
-                    if self.rng.random() < 0.5:
-                        self._mutate_swap(c)
-                    next_pop.append(c)
+                    log("   >>> CATACLISMO (Rápido): Reiniciando vecindad...")
+                    cataclysms_without_improvement += 1
+                    next_pop = np.empty_like(population)
+                    next_pop[:] = best_chrome
+
+                    swap_draws = self.rng.random(self.pop_size - 1)
+                    for c, r in zip(next_pop[1:], swap_draws):
+                        self._mutate_scramble(c)
+                        self._mutate_shift_priority(c)
+                        if r < 0.5:
+                            self._mutate_swap(c)
+
+                    population = next_pop
+                    dirty[:] = True
+                    stagnation_counter = 0
+                    continue
+
+                # Selección y Cruce: élite en O(n) con argpartition (ordenada entre sí)
+                elite_count = min(self.pop_size, max(2, int(self.pop_size * 0.1)))
+                elite_idx = np.argpartition(-fitness, elite_count - 1)[:elite_count]
+                elite_idx = elite_idx[np.argsort(-fitness[elite_idx], kind="stable")]
+                next_pop = np.empty_like(population)
+                next_pop[:elite_count] = population[elite_idx]
+                next_scores = np.empty_like(scores)
+                next_scores[:elite_count] = scores[elite_idx]
+
+                # Sorteos de la generación en lote: 2 torneos de 4 y 2 decisiones de mutación
+                n_children = self.pop_size - elite_count
+                tourneys = self.rng.integers(0, self.pop_size, size=(n_children, 2, 4))
+                parents = self._tournament(fitness, tourneys)
+                mut_draws = self.rng.random((n_children, 2))
+
+                for j, row in enumerate(range(elite_count, self.pop_size)):
+                    child = self._crossover_ox1(
+                        population[parents[j, 0]], population[parents[j, 1]]
+                    )
+
+                    if mut_draws[j, 0] < 0.3:
+                        r_mut = mut_draws[j, 1]
+                        if r_mut < 0.33:
+                            self._mutate_swap(child)
+                        elif r_mut < 0.66:
+                            self._mutate_scramble(child)
+                        else:
+                            self._mutate_shift_priority(child)
+
+                    next_pop[row] = child
 
                 population = next_pop
-                stagnation_counter = 0
-                continue
-
-            # Selección y Cruce
-            elite_count = max(2, int(self.pop_size * 0.1))
-            next_pop = [x[0] for x in fitness_data[:elite_count]]
-
-            while len(next_pop) < self.pop_size:
-                p1 = self._tournament(fitness_data)
-                p2 = self._tournament(fitness_data)
-                child = self._crossover_ox1(p1, p2)
-
-                if self.rng.random() < 0.3:
-                    r_mut = self.rng.random()
-                    if r_mut < 0.33:
-                        self._mutate_swap(child)
-                    elif r_mut < 0.66:
-                        self._mutate_scramble(child)
-                    else:
-                        self._mutate_shift_priority(child)
-
-                next_pop.append(child)
-
-            population = next_pop
-
-        print(
+                scores = next_scores
+                dirty[:] = True
+                dirty[:elite_count] = False
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+        log(
             f"\n[GA] FINAL -> Asignadas: {global_best_assigned}, Max Slot: {global_best_msi}"
         )
 
-        final_demands = [self.demands[i] for i in best_chrome]
         return run_sp_ff(
             self.topology,
-            final_demands,
+            self.demands,
             k=self.k_paths,
             num_slots=self.num_slots,
             export_file=export_file_handle,
+            order=best_chrome,
         )
 
-    def _tournament(self, scored_pop):
-        sample = self.rng.sample(scored_pop, 4)
-        return max(sample, key=lambda x: x[1])[0]
+    def _tournament(self, fitness, samples):
+        """
+        Torneos vectorizados: `samples` tiene los índices sorteados en su último
+        eje; retorna el índice del individuo de mayor fitness de cada torneo.
+        """
+        best = fitness[samples].argmax(axis=-1)
+        return np.take_along_axis(samples, best[..., None], axis=-1)[..., 0]
+
+    def _two_points(self, size):
+        """Dos índices distintos en [0, size), ordenados."""
+        i1 = int(self.rng.integers(size))
+        i2 = int(self.rng.integers(size - 1))
+        if i2 >= i1:
+            i2 += 1
+        return (i1, i2) if i1 < i2 else (i2, i1)
 
     def _crossover_ox1(self, p1, p2):
         size = len(p1)
-        a, b = sorted(self.rng.sample(range(size), 2))
-        child = [-1] * size
+        a, b = self._two_points(size)
+        child = np.empty(size, dtype=np.int32)
         child[a:b] = p1[a:b]
-        current_p2 = 0
-        for i in range(size):
-            if i >= a and i < b:
-                continue
-            while p2[current_p2] in child:
-                current_p2 += 1
-            child[i] = p2[current_p2]
+        # Máscara de pertenencia O(1): genes de p2 fuera del segmento, en orden
+        present = np.zeros(size, dtype=np.bool_)
+        present[p1[a:b]] = True
+        rest = p2[~present[p2]]
+        child[:a] = rest[:a]
+        child[b:] = rest[a:]
         return child
 
     def _mutate_swap(self, chrome):
-        i1, i2 = self.rng.sample(range(len(chrome)), 2)
-        chrome[i1], chrome[i2] = chrome[i2], chrome[i1]
+        i1, i2 = self._two_points(len(chrome))
+        chrome[[i1, i2]] = chrome[[i2, i1]]
 
     def _mutate_scramble(self, chrome):
-        a, b = sorted(self.rng.sample(range(len(chrome)), 2))
-        sub = chrome[a:b]
-        self.rng.shuffle(sub)
-        chrome[a:b] = sub
+        a, b = self._two_points(len(chrome))
+        # Baraja la vista chrome[a:b] en su lugar (sin copiar el segmento)
+        self.rng.shuffle(chrome[a:b])
 
     def _mutate_shift_priority(self, chrome):
         size = len(chrome)
-        idx = self.rng.randint(size // 2, size - 1)
-        val = chrome.pop(idx)
-        chrome.insert(0, val)
+        idx = int(self.rng.integers(size // 2, size))
+        # Desplazamiento contiguo (memmove) en vez de pop/insert
+        val = chrome[idx]
+        chrome[1 : idx + 1] = chrome[:idx]
+        chrome[0] = val
@@ -1,5 +1,5 @@
+from bisect import bisect_left
 import numpy as np
-import math
 
 # --- MODULATION CONFIGURATION ---
 # Format: (name, max_reach_km, bits_per_symbol, slots_per_100gbps)
@@ -11,24 +11,81 @@ MODULATION_FORMATS = [
 ]
 
 
+# Umbrales de alcance (una sola tabla): lista para escalares (bisect, sin
+# overhead de NumPy) y arrays para la búsqueda vectorizada de slots_for
+_REACH_LIST = [m[1] for m in MODULATION_FORMATS]
+_REACH_KM = np.array(_REACH_LIST, dtype=np.int32)
+_SLOTS_PER_100G = np.array([m[3] for m in MODULATION_FORMATS], dtype=np.int64)
+
+
+def _modulation_index(distance_km):
+    """
+    Índice en MODULATION_FORMATS del formato más eficiente que alcanza la
+    distancia (alcance >= distancia); len(MODULATION_FORMATS) si ninguno llega.
+    """
+    return bisect_left(_REACH_LIST, distance_km)
+
+
+def _ceil_slots(bandwidth_gbps, slots_per_100g):
+    """ceil(bw / (100 / slots_100g)) en aritmética entera (escalares o arrays)."""
+    return -(-bandwidth_gbps * slots_per_100g // 100)
+
+
 def get_modulation_params(distance_km):
     """Retorna los parámetros de modulación según la distancia."""
-    for name, max_reach, bps, slots_100g in MODULATION_FORMATS:
-        if distance_km <= max_reach:
-            return {"name": name, "slots_per_100g": slots_100g}
-    return None
+    idx = _modulation_index(distance_km)
+    if idx == len(MODULATION_FORMATS):
+        return None
+    name, _, _, slots_100g = MODULATION_FORMATS[idx]
+    return {"name": name, "slots_per_100g": slots_100g}
+
+
+def slots_for(bandwidth_gbps, distance_km):
+    """
+    Versión vectorizada de calculate_slots: acepta escalares o arrays
+    (con broadcasting). Retorna slots necesarios, 0 si no hay modulación.
+    """
+    bw = np.asarray(bandwidth_gbps, dtype=np.int64)
+    # Mismo criterio que _modulation_index (side="left" == bisect_left)
+    idx = np.searchsorted(_REACH_KM, distance_km)
+    reachable = idx < len(_REACH_KM)
+    sph = _SLOTS_PER_100G[np.minimum(idx, len(_REACH_KM) - 1)]
+    return np.where(reachable, _ceil_slots(bw, sph), 0)
 
 
 def calculate_slots(bandwidth_gbps, distance_km):
     """Calcula slots necesarios. Retorna (num_slots, mod_name)."""
-    mod = get_modulation_params(distance_km)
-    if not mod:
+    idx = _modulation_index(distance_km)
+    if idx == len(MODULATION_FORMATS):
         return None, None
+    name, _, _, slots_100g = MODULATION_FORMATS[idx]
+    return _ceil_slots(int(bandwidth_gbps), slots_100g), name
+
+
+def build_edge_index(topology):
+    """Asigna un id entero a cada enlace dirigido (u, v) de la topología."""
+    edge_index = {}
+    for u, v in topology.edges():
+        edge_index[(u, v)] = len(edge_index)
+        edge_index[(v, u)] = len(edge_index)
+    return edge_index
 
-    # Capacidad por slot = 100G / slots_necesarios_para_100G
-    capacity_per_slot = 100.0 / mod["slots_per_100g"]
-    slots_needed = math.ceil(bandwidth_gbps / capacity_per_slot)
-    return int(slots_needed), mod["name"]
+
+def find_free_run(free, num_slots):
+    """
+    Retorna el índice del primer bit de la primera racha de `num_slots` bits
+    en 1 de `free` (bitset de slots libres), o None si no existe.
+    SWAR: tras cada paso, el bit p indica que p..p+span-1 están libres.
+    """
+    x = free
+    span = 1
+    while span < num_slots and x:
+        step = min(span, num_slots - span)
+        x &= x >> step
+        span += step
+    if not x:
+        return None
+    return (x & -x).bit_length() - 1
 
 
 # --- NETWORK STATE ---
@@ -41,57 +98,90 @@ class Network:
     def __init__(self, topology, num_slots=320):
         self.topology = topology
         self.num_slots = num_slots
-        # spectrum[(u, v)] es un array booleano: False=Libre, True=Ocupado
-        self.spectrum = {}
-        for u, v in self.topology.edges():
-            self.spectrum[(u, v)] = np.zeros(num_slots, dtype=bool)
-            self.spectrum[(v, u)] = np.zeros(num_slots, dtype=bool)
+        self.full_mask = (1 << num_slots) - 1
+        self.edge_index = build_edge_index(topology)
+        # occ[edge_id] es un bitset (int): bit i en 1 = slot i ocupado
+        self.occ = [0] * len(self.edge_index)
+        # Contadores incrementales: evitan recorrer todos los enlaces al consultar
+        self._max_slot_used = -1
+        self._used_slots = 0
+        # Caché camino -> ids de enlaces (la topología no cambia)
+        self._path_edges = {}
+
+    def path_edge_ids(self, path):
+        """Ids de los enlaces dirigidos que recorre el camino (memoizados)."""
+        key = tuple(path)
+        edge_ids = self._path_edges.get(key)
+        if edge_ids is None:
+            edge_ids = tuple(
+                self.edge_index[(key[i], key[i + 1])] for i in range(len(key) - 1)
+            )
+            self._path_edges[key] = edge_ids
+        return edge_ids
+
+    def _path_occupancy(self, path):
+        merged = 0
+        for e in self.path_edge_ids(path):
+            merged |= self.occ[e]
+        return merged
 
     def is_path_free(self, path, start_slot, num_slots):
         """Verifica si un rango de slots está libre en todos los enlaces del camino."""
         if start_slot + num_slots > self.num_slots:
             return False
 
-        for i in range(len(path) - 1):
-            u, v = path[i], path[i + 1]
-            if self.spectrum[(u, v)][start_slot : start_slot + num_slots].any():
-                return False
-        return True
+        window = ((1 << num_slots) - 1) << start_slot
+        return not (self._path_occupancy(path) & window)
 
     def find_first_fit(self, path, num_slots):
         """
         Encuentra el primer índice de slot válido para el camino.
-        Optimización: Busca huecos continuos.
+        Optimización: OR de los bitsets del camino y búsqueda SWAR del hueco.
         """
-        for i in range(self.num_slots - num_slots + 1):
-            if self.is_path_free(path, i, num_slots):
-                return i
-        return None
+        free = ~self._path_occupancy(path) & self.full_mask
+        return find_free_run(free, num_slots)
+
+    def find_and_allocate(self, path, num_slots):
+        """
+        First Fit + asignación en una sola pasada: resuelve los enlaces una vez,
+        busca el hueco sobre el bitset combinado y lo marca en cada enlace.
+        Retorna el slot inicial o None si no hay espacio.
+        """
+        edge_ids = self.path_edge_ids(path)
+        merged = 0
+        for e in edge_ids:
+            merged |= self.occ[e]
+
+        start_slot = find_free_run(~merged & self.full_mask, num_slots)
+        if start_slot is not None:
+            window = ((1 << num_slots) - 1) << start_slot
+            for e in edge_ids:
+                self.occ[e] |= window
+            # La ventana estaba libre en todos los enlaces
+            self._used_slots += num_slots * len(edge_ids)
+            self._max_slot_used = max(self._max_slot_used, start_slot + num_slots - 1)
+        return start_slot
 
     def allocate(self, path, start_slot, num_slots):
         """Marca los slots como ocupados."""
-        for i in range(len(path) - 1):
-            u, v = path[i], path[i + 1]
-            self.spectrum[(u, v)][start_slot : start_slot + num_slots] = True
+        window = ((1 << num_slots) - 1) << start_slot
+        for e in self.path_edge_ids(path):
+            # Solo cuentan los slots que no estaban ya ocupados
+            self._used_slots += (window & ~self.occ[e]).bit_count()
+            self.occ[e] |= window
+        self._max_slot_used = max(self._max_slot_used, start_slot + num_slots - 1)
 
     def get_utilization(self):
         """Calcula el porcentaje de uso total de la red."""
-        total_slots = len(self.spectrum) * self.num_slots
-        used_slots = sum(np.sum(arr) for arr in self.spectrum.values())
-        return (used_slots / total_slots) * 100.0 if total_slots > 0 else 0.0
+        total_slots = len(self.occ) * self.num_slots
+        return (self._used_slots / total_slots) * 100.0 if total_slots > 0 else 0.0
 
     def get_max_slot_used(self):
         """Retorna el índice del slot más alto utilizado en toda la red (Max FSU Index)."""
-        max_slot = -1
-        for slots in self.spectrum.values():
-            indices = np.where(slots)[0]
-            if indices.size > 0:
-                current_max = indices.max()
-                if current_max > max_slot:
-                    max_slot = current_max
-        return int(max_slot)
+        return self._max_slot_used
 
     def reset(self):
         """Limpia todo el espectro."""
-        for key in self.spectrum:
-            self.spectrum[key].fill(False)
+        self.occ = [0] * len(self.edge_index)
+        self._max_slot_used = -1
+        self._used_slots = 0
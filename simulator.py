@@ -1,5 +1,6 @@
+import os
+import sys
 import time
-import matplotlib.pyplot as plt
 import numpy as np
 from topology import create_nsfnet
 from traffic import DemandGenerator
@@ -24,11 +25,33 @@ def print_summary(alg_name, result, time_taken):
     }
 
 
+def _import_pyplot():
+    """
+    Importa pyplot solo al graficar (su carga es lenta). Sin display
+    (Linux por SSH/CI) se fuerza Agg: evita cargar bindings GUI cuando
+    solo se va a guardar el PNG. MPLBACKEND tiene prioridad.
+    """
+    import matplotlib
+
+    if (
+        sys.platform.startswith("linux")
+        and "MPLBACKEND" not in os.environ
+        and not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+    ):
+        matplotlib.use("Agg")
+
+    import matplotlib.pyplot as plt
+
+    return matplotlib, plt
+
+
 def plot_results(data):
     """Genera gráficos de barras comparando los dos algoritmos."""
     if not data:
         return
 
+    matplotlib, plt = _import_pyplot()
+
     names = [d["Algorithm"] for d in data]
     max_slots = [d["Max_Slot"] for d in data]
     assigned = [d["Assigned"] for d in data]
@@ -36,7 +59,7 @@ def plot_results(data):
     x = np.arange(len(names))
     width = 0.35
 
-    fig, ax1 = plt.subplots(figsize=(8, 6))
+    fig, ax1 = plt.subplots(figsize=(8, 6), constrained_layout=True)
 
     # --- Eje Izquierdo: Max Slot Index (Barras Azules) ---
     color1 = "#1f77b4"
@@ -90,11 +113,14 @@ def plot_results(data):
         ncol=2,
     )
 
-    fig.tight_layout()
     output_filename = "resultado_comparativa.png"
     plt.savefig(output_filename)
     print(f"\n[GRÁFICO] Guardado exitosamente en: '{output_filename}'")
 
+    if matplotlib.get_backend().lower() == "agg":
+        plt.close(fig)
+        return
+
     try:
         plt.show()
     except Exception:
@@ -138,7 +164,14 @@ def main():
         f.write(">>> 2. Genetic Algorithm (Optimized)\n")
         start = time.time()
         ga = GeneticOptimizer(
-            topo, demands_original, pop_size=50, generations=100, num_slots=NUM_SLOTS
+            topo,
+            demands_original,
+            pop_size=50,
+            generations=100,
+            num_slots=NUM_SLOTS,
+            n_jobs=1,
+            max_stagnant_cataclysms=3,
+            min_generations=30,
         )
         res_ga = ga.optimize(export_file_handle=f)
 
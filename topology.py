@@ -1,3 +1,5 @@
+from functools import lru_cache
+from heapq import heappop, heappush
 import networkx as nx
 
 
@@ -63,13 +65,151 @@ def get_path_distance(G, path):
     return dist
 
 
+def get_edge_key(G):
+    """
+    Firma hashable de la topología (enlaces con distancia). Se recalcula en cada
+    llamada para que un cambio en el grafo nunca reutilice caminos viejos.
+    """
+    return frozenset((min(u, v), max(u, v), d) for u, v, d in G.edges(data="distance"))
+
+
+def create_adjacency(edges):
+    """
+    Listas de adyacencia de un grafo no dirigido a partir de (u, v, distancia):
+    adj[u] = [(v, distancia), ...] y weight[(u, v)] = distancia en ambos sentidos.
+    """
+    edges = sorted(edges)
+    n = max(max(u, v) for u, v, _ in edges) + 1 if edges else 0
+    adj = [[] for _ in range(n)]
+    weight = {}
+    for u, v, d in edges:
+        adj[u].append((v, d))
+        adj[v].append((u, d))
+        weight[(u, v)] = d
+        weight[(v, u)] = d
+    return adj, weight
+
+
+def _dijkstra(adj, source, target, banned_nodes, banned_edges):
+    """Camino mínimo (distancia, camino) evitando nodos/enlaces; None si no existe."""
+    dist = {source: 0}
+    prev = {}
+    heap = [(0, source)]
+    done = set()
+    while heap:
+        d, u = heappop(heap)
+        if u in done:
+            continue
+        if u == target:
+            path = [u]
+            while u != source:
+                u = prev[u]
+                path.append(u)
+            return d, path[::-1]
+        done.add(u)
+        for v, w in adj[u]:
+            if v in banned_nodes or (u, v) in banned_edges:
+                continue
+            nd = d + w
+            if v not in dist or nd < dist[v]:
+                dist[v] = nd
+                prev[v] = u
+                heappush(heap, (nd, v))
+    return None
+
+
+def yen_k_shortest(adj, weight, source, target, k):
+    """Yen's algorithm sobre listas de adyacencia. Retorna [(camino, distancia)]."""
+    n = len(adj)
+    if not (0 <= source < n and 0 <= target < n) or source == target:
+        return []
+
+    first = _dijkstra(adj, source, target, set(), set())
+    if first is None:
+        return []
+
+    found = [(first[1], first[0])]
+    # Índice de desvío de cada camino encontrado respecto de su padre (Lawler):
+    # los spurs anteriores a ese índice ya se generaron desde el padre
+    deviations = [0]
+    candidates = []
+    seen = {tuple(first[1])}
+    counter = 0
+    while len(found) < k:
+        last_path = found[-1][0]
+        prefix_cost = [0]
+        for j in range(len(last_path) - 1):
+            prefix_cost.append(
+                prefix_cost[-1] + weight[(last_path[j], last_path[j + 1])]
+            )
+        for i in range(deviations[-1], len(last_path) - 1):
+            root = last_path[: i + 1]
+            root_cost = prefix_cost[i]
+            # Se bloquean los enlaces que ya usaron caminos con la misma raíz
+            banned_edges = set()
+            for path, _ in found:
+                if path[: i + 1] == root:
+                    banned_edges.add((path[i], path[i + 1]))
+                    banned_edges.add((path[i + 1], path[i]))
+            spur = _dijkstra(adj, root[-1], target, set(root[:-1]), banned_edges)
+            if spur is None:
+                continue
+            total_path = root[:-1] + spur[1]
+            key = tuple(total_path)
+            if key not in seen:
+                seen.add(key)
+                heappush(candidates, (root_cost + spur[0], counter, total_path, i))
+                counter += 1
+        if not candidates:
+            break
+        cost, _, path, deviation = heappop(candidates)
+        found.append((path, cost))
+        deviations.append(deviation)
+
+    return found
+
+
+@lru_cache(maxsize=None)
+def _cached_adjacency(edge_key):
+    return create_adjacency(edge_key)
+
+
+@lru_cache(maxsize=None)
+def _cached_k_shortest_paths_with_dist(edge_key, source, target, k):
+    return tuple(
+        (tuple(path), dist)
+        for path, dist in yen_k_shortest(
+            *_cached_adjacency(edge_key), source, target, k
+        )
+    )
+
+
+@lru_cache(maxsize=None)
+def _cached_k_shortest_paths(edge_key, source, target, k):
+    return tuple(
+        path
+        for path, _ in _cached_k_shortest_paths_with_dist(edge_key, source, target, k)
+    )
+
+
 def get_k_shortest_paths(G, source, target, k=3):
-    """Wrapper optimizado para Yen's algorithm de NetworkX."""
-    try:
-        generator = nx.shortest_simple_paths(G, source, target, weight="distance")
-        paths = []
-        for _ in range(k):
-            paths.append(next(generator))
-        return paths
-    except (nx.NetworkXNoPath, StopIteration):
-        return paths
+    """
+    K caminos más cortos (Yen) sobre la adyacencia de la topología.
+    Memoizado por (topología, origen, destino, k); retorna tupla de tuplas.
+    """
+    return _cached_k_shortest_paths(get_edge_key(G), source, target, k)
+
+
+def get_k_shortest_paths_with_dist(G, source, target, k=3):
+    """Como get_k_shortest_paths, pero retorna tuplas (camino, distancia_km)."""
+    return _cached_k_shortest_paths_with_dist(get_edge_key(G), source, target, k)
+
+
+def clear_path_cache():
+    """
+    Vacía la caché de caminos (libera memoria o aísla pruebas). No hace falta
+    tras modificar el grafo: la clave se recalcula a partir de sus enlaces.
+    """
+    _cached_k_shortest_paths.cache_clear()
+    _cached_k_shortest_paths_with_dist.cache_clear()
+    _cached_adjacency.cache_clear()
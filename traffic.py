@@ -1,40 +1,66 @@
-import random
+from dataclasses import dataclass
+import numpy as np
+
+
+@dataclass
+class Demands:
+    """Demandas en formato struct-of-arrays: un array int32 por campo."""
+
+    src: np.ndarray
+    dst: np.ndarray
+    bw: np.ndarray
+    id: np.ndarray
+
+    def __len__(self):
+        return len(self.id)
+
+    @classmethod
+    def from_columns(cls, src, dst, bw, ids=None):
+        if ids is None:
+            ids = range(len(src))
+        return cls(
+            src=np.asarray(src, dtype=np.int32),
+            dst=np.asarray(dst, dtype=np.int32),
+            bw=np.asarray(bw, dtype=np.int32),
+            id=np.asarray(ids, dtype=np.int32),
+        )
+
+    def to_dicts(self):
+        """Compatibilidad: lista de dicts (solo para exportar/imprimir)."""
+        return [
+            {"id": int(i), "source": int(s), "destination": int(d), "bandwidth": int(b)}
+            for i, s, d, b in zip(self.id, self.src, self.dst, self.bw)
+        ]
 
 
 class DemandGenerator:
     def __init__(self, num_nodes, seed=42):
         self.num_nodes = num_nodes
-        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed)
 
     def generate_exponential(self, num_demands, avg_bw=100.0):
-        demands = []
-        for i in range(num_demands):
-            src = self.rng.randint(0, self.num_nodes - 1)
-            dst = self.rng.randint(0, self.num_nodes - 1)
-            while src == dst:
-                dst = self.rng.randint(0, self.num_nodes - 1)
-
-            # Distribución exponencial para el ancho de banda
-            bw = int(self.rng.expovariate(1.0 / avg_bw))
-            bw = max(10, min(bw, 1000))  # Clampear entre 10Gbps y 1Tbps
-
-            demands.append(
-                {"id": i, "source": src, "destination": dst, "bandwidth": bw}
-            )
-        return demands
+        # Destino = origen + desplazamiento en [1, n): nunca coincide con el origen
+        # y queda uniforme sobre los otros n-1 nodos, sin bucle de rechazo
+        src = self.np_rng.integers(0, self.num_nodes, size=num_demands)
+        offset = self.np_rng.integers(1, self.num_nodes, size=num_demands)
+        dst = (src + offset) % self.num_nodes
+
+        # Distribución exponencial para el ancho de banda
+        bw = self.np_rng.exponential(avg_bw, size=num_demands).astype(np.int32)
+        bw = bw.clip(10, 1000)  # Clampear entre 10Gbps y 1Tbps
+
+        return Demands.from_columns(src, dst, bw)
 
     def generate_full_mesh(self, topology, avg_bw=100.0):
         """Genera tráfico entre todos los pares (N*(N-1))."""
-        demands = []
-        nodes = list(topology.nodes())
-        counter = 0
-        for u in nodes:
-            for v in nodes:
-                if u != v:
-                    bw = int(self.rng.expovariate(1.0 / avg_bw))
-                    bw = max(25, bw)
-                    demands.append(
-                        {"id": counter, "source": u, "destination": v, "bandwidth": bw}
-                    )
-                    counter += 1
-        return demands
+        nodes = np.asarray(list(topology.nodes()), dtype=np.int32)
+        n = len(nodes)
+        # Todos los pares (u, v) con u != v: por cada origen, todos los destinos
+        src = np.repeat(nodes, n)
+        dst = np.tile(nodes, n)
+        keep = src != dst
+        src, dst = src[keep], dst[keep]
+
+        bw = self.np_rng.exponential(avg_bw, size=len(src)).astype(np.int32)
+        bw = np.maximum(bw, 25)
+        return Demands.from_columns(src, dst, bw)